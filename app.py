@@ -1,9 +1,76 @@
+import re
+import sys
+import queue
+import hashlib
+import threading
+import subprocess
 import streamlit as st
+from concurrent.futures import ThreadPoolExecutor
 from utils.rag_utils import retrieve_similar_documents
 from models.llm import generate_llm
 from utils.web_search import live_web_search, search_banking_news, get_current_repo_rate, search_banking_regulations
 from utils.common_utils import cache
 
+# Web search routes checked in priority order, the first matching pattern wins
+ROUTE_PATTERNS = [
+    (re.compile(r"repo rate|rbi rate|monetary policy|interest rate"), "rate"),
+    (re.compile(r"news|latest|recent|update|current|today|happening|developments|announcements"), "news"),
+    (re.compile(r"regulation|policy|guideline|rule|compliance|requirement"), "regs"),
+    (re.compile(r"current|today|latest|new|recent|what is|how to|where to|when|which bank"), "search"),
+]
+
+def classify_query(query):
+    # Pick the web search route for a query in one pass per pattern
+    query_lower = query.lower()
+    for pattern, route in ROUTE_PATTERNS:
+        if pattern.search(query_lower):
+            return route
+    return "generic"
+
+def stream_script_output(script, idle_timeout):
+    # Run a script and show its latest output lines while it runs.
+    # Raises subprocess.TimeoutExpired if it prints nothing for idle_timeout seconds.
+    process = subprocess.Popen([sys.executable, "-u", script], stdout=subprocess.PIPE,
+                               stderr=subprocess.STDOUT, text=True, bufsize=1)
+
+    # Read on a separate thread so a silent script can still time out
+    lines = queue.Queue()
+    def read_output():
+        for line in process.stdout:
+            lines.put(line)
+        lines.put(None)
+    threading.Thread(target=read_output, daemon=True).start()
+
+    placeholder = st.empty()
+    output = []
+    try:
+        while True:
+            try:
+                line = lines.get(timeout=idle_timeout)
+            except queue.Empty:
+                raise subprocess.TimeoutExpired(process.args, idle_timeout)
+            if line is None:
+                break
+            output.append(line)
+            placeholder.code("".join(output[-30:]))
+
+        return process.wait(), "".join(output)
+    finally:
+        # Don't leave the script running if we time out or Streamlit stops/reruns this script
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        process.stdout.close()
+
+# Web search for each route: (status message, context label, search function)
+WEB_SEARCH_HANDLERS = {
+    "rate": ("📊 Searching for current RBI repo rate...", "Current Information", lambda q: get_current_repo_rate()),
+    "news": ("📰 Searching for latest banking news...", "Latest News", lambda q: search_banking_news()),
+    "regs": ("📋 Searching for banking regulations...", "Regulation Information", search_banking_regulations),
+    "search": ("🌐 Performing targeted web search...", "Web Search Results", live_web_search),
+    "generic": ("🌐 Performing comprehensive web search...", "Web Search Results", live_web_search),
+}
+
 # Basic setup for the app
 st.set_page_config(page_title="Banking Assistant Chatbot", page_icon="🏦", layout="wide")
 
@@ -26,15 +93,10 @@ with col3:
     if st.button("🔄 Refresh Data"):
         try:
             with st.spinner("🔄 Updating banking data..."):
-                # Import and run the scraper
-                import subprocess
-                import sys
-                
-                # Run the met_scraper.py script
-                result = subprocess.run([sys.executable, "data/met_scraper.py"], 
-                                      capture_output=True, text=True, timeout=60)
+                # Run the met_scraper.py script, showing its log as it runs
+                returncode, output = stream_script_output("data/met_scraper.py", idle_timeout=60)
                 
-                if result.returncode == 0:
+                if returncode == 0:
                     st.success("✅ Banking data updated successfully!")
                     st.info("New data has been merged with existing knowledge base")
                     
@@ -42,18 +104,15 @@ with col3:
                     if st.button("🔄 Rebuild Search Index (Recommended)"):
                         try:
                             with st.spinner("🔧 Rebuilding search index..."):
-                                # Run the build_faiss_index.py script
-                                index_result = subprocess.run([sys.executable, "build_faiss_index.py"], 
-                                                           capture_output=True, text=True, timeout=120)
+                                # Run the build_faiss_index.py script, showing its log as it runs
+                                index_returncode, index_output = stream_script_output("build_faiss_index.py", idle_timeout=120)
                                 
-                                if index_result.returncode == 0:
+                                if index_returncode == 0:
                                     st.success("✅ Search index rebuilt successfully!")
                                     st.info("Your assistant now has access to the latest data")
                                 else:
                                     st.warning("⚠️ Index rebuild completed with some issues")
-                                    st.text(f"Output: {index_result.stdout}")
-                                    if index_result.stderr:
-                                        st.text(f"Errors: {index_result.stderr}")
+                                    st.text(f"Output: {index_output}")
                         except subprocess.TimeoutExpired:
                             st.error("⏰ Index rebuild timed out. Please try again.")
                         except Exception as e:
@@ -61,9 +120,7 @@ with col3:
                             st.info("You can also run manually: python3 build_faiss_index.py")
                 else:
                     st.warning("⚠️ Data update completed with some issues")
-                    st.text(f"Output: {result.stdout}")
-                    if result.stderr:
-                        st.text(f"Errors: {result.stderr}")
+                    st.text(f"Output: {output}")
                         
         except subprocess.TimeoutExpired:
             st.error("⏰ Data update timed out. Please try again.")
@@ -84,17 +141,23 @@ Use **Concise** for short answers or **Detailed** for in-depth explanations.
 
 st.markdown("---")
 
-# Chat history
-if "chat_history" not in st.session_state:
-    st.session_state.chat_history = []
+# Chat history stored as parallel lists of roles and contents
+roles = st.session_state.setdefault("roles", [])
+contents = st.session_state.setdefault("contents", [])
 
-for entry in st.session_state.chat_history:
-    with st.chat_message(entry["role"]):
-        st.markdown(entry["content"])
+def add_message(role, content):
+    # Append one turn to the chat history
+    roles.append(role)
+    contents.append(content)
+
+# Streamlit clears the page on every rerun, so all turns are drawn again
+for role, content in zip(roles, contents):
+    with st.chat_message(role):
+        st.markdown(content)
 
 # Chat input
 if query := st.chat_input("🔍 Ask a banking question:"):
-    st.session_state.chat_history.append({"role": "user", "content": query})
+    add_message("user", query)
 
     with st.chat_message("user"):
         st.markdown(query)
@@ -102,59 +165,43 @@ if query := st.chat_input("🔍 Ask a banking question:"):
     with st.spinner("🔍 Searching knowledge base and generating reply..."):
         try:
             # Check cache first for improved performance
-            cache_key = f"query_{hash(query)}"
+            # Stable digest of the normalized query so case/whitespace variants share a key
+            normalized_query = query.strip().lower()
+            cache_key = "query_" + hashlib.blake2b(normalized_query.encode("utf-8"), digest_size=16).hexdigest()
             cached_response = cache.get(cache_key)
             if cached_response:
                 st.info("📋 Retrieved response from cache for faster delivery")
-                st.session_state.chat_history.append({"role": "assistant", "content": cached_response})
+                add_message("assistant", cached_response)
                 with st.chat_message("assistant"):
                     st.markdown(cached_response)
             else:
-                # Get context from knowledge base (only if not cached)
-                context_chunks = retrieve_similar_documents(query, top_k=5)
+                # Choose the web search (if enabled) before starting any requests
+                web_search = None
+                if enable_web_search:
+                    st.info("🔍 **Web Search Active** - Fetching real-time information...")
+                    status, web_label, web_search = WEB_SEARCH_HANDLERS[classify_query(query)]
+                    st.info(status)
+
+                # Knowledge base retrieval and web search are independent, so run them concurrently
+                with ThreadPoolExecutor(max_workers=2) as executor:
+                    context_future = executor.submit(retrieve_similar_documents, query, 5)
+                    web_future = executor.submit(web_search, query) if web_search else None
+                    context_chunks = context_future.result()
+                    web_results = web_future.result() if web_future else None
                 context = "\n---\n".join(context_chunks)
             
-                # Add web search if enabled
+                # Add web search results if enabled
                 web_context = ""
-                if enable_web_search:
-                    with st.spinner("🌐 Searching web for current information..."):
-                        st.info("🔍 **Web Search Active** - Fetching real-time information...")
-                        
-                        # Enhanced query type detection for maximum performance
-                        query_lower = query.lower()
-                        
-                        # Repo rate queries
-                        if any(term in query_lower for term in ["repo rate", "rbi rate", "monetary policy", "interest rate"]):
-                            st.info("📊 Searching for current RBI repo rate...")
-                            web_context = f"\n\nCurrent Information:\n{get_current_repo_rate()}"
-                        
-                        # News queries - expanded detection
-                        elif any(term in query_lower for term in ["news", "latest", "recent", "update", "current", "today", "happening", "developments", "announcements"]):
-                            st.info("📰 Searching for latest banking news...")
-                            web_context = f"\n\nLatest News:\n{search_banking_news()}"
-                        
-                        # Regulation queries - expanded detection
-                        elif any(term in query_lower for term in ["regulation", "policy", "guideline", "rule", "compliance", "requirement"]):
-                            st.info("📋 Searching for banking regulations...")
-                            web_context = f"\n\nRegulation Information:\n{search_banking_regulations(query)}"
-                        
-                        # Banking-specific queries that should use web search
-                        elif any(term in query_lower for term in ["current", "today", "latest", "new", "recent", "what is", "how to", "where to", "when", "which bank"]):
-                            st.info("🌐 Performing targeted web search...")
-                            web_context = f"\n\nWeb Search Results:\n{live_web_search(query)}"
-                        
-                        # Default web search for all other queries
-                        else:
-                            st.info("🌐 Performing comprehensive web search...")
-                            web_context = f"\n\nWeb Search Results:\n{live_web_search(query)}"
-                        
-                        if web_context and "error" not in web_context.lower():
-                            st.success("✅ Web search completed successfully!")
-                            # Debug: Show what was found
-                            if len(web_context) > 100:
-                                st.info(f"📊 Found {len(web_context)} characters of web search results")
-                        else:
-                            st.warning("⚠️ Web search completed with limited results")
+                if web_future:
+                    web_context = f"\n\n{web_label}:\n{web_results}"
+                    
+                    if web_context and "error" not in web_context.lower():
+                        st.success("✅ Web search completed successfully!")
+                        # Debug: Show what was found
+                        if len(web_context) > 100:
+                            st.info(f"📊 Found {len(web_context)} characters of web search results")
+                    else:
+                        st.warning("⚠️ Web search completed with limited results")
 
                 prompt = f"""
                 You are an expert Indian banking assistant. Use the context below to answer the user's question.
@@ -186,15 +233,14 @@ if query := st.chat_input("🔍 Ask a banking question:"):
                 7. Provide actionable insights based on the current information found
                 """
 
-                response = generate_llm(prompt, mode=mode)
+                # Stream tokens to the page as they arrive
+                with st.chat_message("assistant"):
+                    response = st.write_stream(generate_llm(prompt, mode=mode, stream=True))
 
                 # Cache the response for future use
                 cache.set(cache_key, response)
 
-                st.session_state.chat_history.append({"role": "assistant", "content": response})
-
-                with st.chat_message("assistant"):
-                    st.markdown(response)
+                add_message("assistant", response)
 
         except Exception as e:
             st.error(f"Error: {str(e)}")
@@ -1,9 +1,14 @@
 import os
 import json
+import asyncio
+import hashlib
 import faiss
 import numpy as np
 import sys
-from openai import AzureOpenAI
+from itertools import chain, islice
+from joblib import Parallel, delayed
+from openai import AsyncAzureOpenAI, APIConnectionError, RateLimitError
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential_jitter
 from config.config import AZURE_EMBEDDING_API_KEY, AZURE_EMBEDDING_ENDPOINT, AZURE_EMBEDDING_VERSION, AZURE_EMBEDDING, validate_config
 
 # Add current directory to find utils
@@ -13,21 +18,61 @@ from utils.common_utils import data_processor, text_processor
 # Settings
 INPUT_JSONL = "data/banking_documents.jsonl"
 INDEX_PATH = "faiss_index"
+CHUNKS_FILE = os.path.join(INDEX_PATH, "chunks.jsonl")
 CHUNK_SIZE = 300
 CHUNK_OVERLAP = 50
 
+# Worker processes used for chunking (-1 uses every core)
+CHUNK_JOBS = -1
+
+# Embeddings from previous builds, keyed by chunk content hash (keys and
+# vectors in one file, so they are always replaced together)
+EMBED_CACHE_FILE = os.path.join(INDEX_PATH, "emb_cache.npz")
+
+# Embedding requests in flight at once and per-request timeout (seconds)
+EMBED_CONCURRENCY = 8
+EMBED_TIMEOUT = 30
+
+# Chunks per embedding request, and chunks read per step while streaming
+# the corpus (one full batch for every concurrent request)
+EMBED_BATCH_SIZE = 128
+EMBED_WINDOW = EMBED_BATCH_SIZE * EMBED_CONCURRENCY
+
+# Index type: "hnsw" (graph), "ivfpq" (inverted lists + product quantization),
+# "sq_fp16" / "sq8" (flat scan over float16 / 8-bit scalar-quantized vectors)
+# or "binary" (1-bit Hamming index with FP32 rescoring, no FP32 index)
+INDEX_TYPE = "hnsw"
+
+# HNSW graph settings
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 64
+
+# IVF-PQ settings (PQ_M must divide the embedding dimension)
+PQ_M = 96
+PQ_NBITS = 8
+
+# Azure client, created on first use and reused for every batch
+_client = None
+
 # Get Azure client
 def get_azure_client():
     # Get Azure OpenAI client
+    global _client
+    if _client is not None:
+        return _client
+
     try:
         # Validate configuration
         validate_config()
         
-        return AzureOpenAI(
+        _client = AsyncAzureOpenAI(
             api_key=AZURE_EMBEDDING_API_KEY,
             api_version=AZURE_EMBEDDING_VERSION,
             azure_endpoint=AZURE_EMBEDDING_ENDPOINT,
+            timeout=EMBED_TIMEOUT,
         )
+        return _client
     except Exception as e:
         print(f"Failed to initialize Azure OpenAI client: {e}")
         return None
@@ -37,83 +82,244 @@ def chunk_text(text, chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP):
     return text_processor.chunk_text(text, chunk_size, overlap)
 
 def load_documents(jsonl_path):
-    # Load documents and split into chunks
-    documents = data_processor.load_jsonl(jsonl_path)
+    # Stream documents and yield their chunks, chunking documents in parallel
+    texts = (
+        f"{doc.get('title', '')}\n{doc.get('content', '')}"
+        for doc in data_processor.iter_jsonl(jsonl_path)
+    )
+    chunk_lists = Parallel(n_jobs=CHUNK_JOBS, return_as="generator")(
+        delayed(text_processor.chunk_text)(text, CHUNK_SIZE, CHUNK_OVERLAP) for text in texts
+    )
+    for chunks in chunk_lists:
+        yield from chunks
+
+def iter_batches(items, size):
+    # Yield lists of up to size items from any iterable
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+def chunk_key(chunk):
+    # Stable content hash used to look up a chunk's cached embedding
+    return hashlib.blake2b(chunk.encode("utf-8"), digest_size=16).hexdigest()
+
+def load_embedding_cache():
+    # Load embeddings from the previous build, keyed by chunk hash
+    try:
+        with np.load(EMBED_CACHE_FILE) as cache_file:
+            keys = cache_file["keys"]
+            vectors = cache_file["vectors"]
+            model = str(cache_file["model"])
+    except FileNotFoundError:
+        return {}, None
+    except Exception as e:
+        # A truncated or otherwise broken cache only means everything is re-embedded
+        print(f"Ignoring unreadable embedding cache: {e}")
+        return {}, None
+
+    # Embeddings from a different model are not comparable
+    if model != AZURE_EMBEDDING or len(keys) != len(vectors):
+        return {}, None
+
+    return {key: row for row, key in enumerate(keys)}, vectors
+
+def save_embedding_cache(keys, embeddings):
+    # Save embeddings with their chunk hashes for the next build
+    os.makedirs(INDEX_PATH, exist_ok=True)
+    # Write to a temporary file and swap it in, so a crash never leaves a partial cache
+    staged_path = EMBED_CACHE_FILE + ".tmp"
+    with open(staged_path, "wb") as f:
+        np.savez(f, keys=np.array(keys), vectors=embeddings, model=np.array(AZURE_EMBEDDING))
+    os.replace(staged_path, EMBED_CACHE_FILE)
+
+@retry(
+    wait=wait_exponential_jitter(initial=1, max=30),
+    stop=stop_after_attempt(6),
+    retry=retry_if_exception_type((RateLimitError, APIConnectionError)),
+    reraise=True,
+)
+async def create_embeddings(client, batch):
+    # Embed one batch, retrying rate limits and connection errors with backoff
+    response = await client.embeddings.create(model=AZURE_EMBEDDING, input=batch)
+    return np.asarray([d.embedding for d in response.data], dtype=np.float32)
+
+async def embed_texts(client, texts):
+    # Generate embeddings for texts, sending batches concurrently
+    batches = list(iter_batches(texts, EMBED_BATCH_SIZE))
+    semaphore = asyncio.Semaphore(EMBED_CONCURRENCY)
     
-    all_chunks = []
-    for doc in documents:
-        title = doc.get("title", "")
-        content = doc.get("content", "")
-        full_text = f"{title}\n{content}"
-        chunks = text_processor.chunk_text(full_text, CHUNK_SIZE, CHUNK_OVERLAP)
-        all_chunks.extend(chunks)
-        
-    return all_chunks
+    print(f"Generating embeddings for {len(texts)} chunks...")
+    
+    async def embed_batch(batch_num, batch):
+        async with semaphore:
+            embeddings = await create_embeddings(client, batch)
+        print(f"   Processed batch {batch_num}/{len(batches)}")
+        return embeddings
+    
+    results = await asyncio.gather(
+        *(embed_batch(i + 1, batch) for i, batch in enumerate(batches)),
+        return_exceptions=True,
+    )
+    
+    # gather keeps batch order, so results line up with texts
+    for i, result in enumerate(results):
+        if isinstance(result, Exception):
+            print(f"Error embedding batch {i + 1}: {result}")
+            raise result
+    
+    # Single contiguous (num_texts, dim) array
+    return np.concatenate(results, axis=0)
 
-def embed_chunks(chunks):
-    # Generate embeddings for text chunks
-    if not chunks:
-        raise ValueError("No chunks provided for embedding")
+async def embed_chunks(chunks, chunks_file):
+    # Embed chunks from an iterable window by window, writing each chunk to
+    # chunks_file as it is consumed. Only new or changed chunks go to Azure.
+    cached_rows, cached_vectors = load_embedding_cache()
+    client = None
+    keys = []
+    embedded_windows = []
     
-    client = get_azure_client()
-    if client is None:
-        raise ValueError("Azure OpenAI client not available. Please check your configuration.")
+    for window in iter_batches(chunks, EMBED_WINDOW):
+        for chunk in window:
+            chunks_file.write(json.dumps({"text": chunk}) + "\n")
+        
+        window_keys = [chunk_key(chunk) for chunk in window]
+        known_positions = [i for i, key in enumerate(window_keys) if key in cached_rows]
+        new_positions = [i for i, key in enumerate(window_keys) if key not in cached_rows]
+        print(f"Reusing {len(known_positions)} cached embeddings, {len(new_positions)} chunks need embedding")
+        
+        new_vectors = None
+        if new_positions:
+            if client is None:
+                client = get_azure_client()
+                if client is None:
+                    raise ValueError("Azure OpenAI client not available. Please check your configuration.")
+            new_vectors = await embed_texts(client, [window[i] for i in new_positions])
+        
+        dim = new_vectors.shape[1] if new_vectors is not None else cached_vectors.shape[1]
+        window_embeddings = np.empty((len(window), dim), dtype=np.float32)
+        if known_positions:
+            window_embeddings[known_positions] = cached_vectors[[cached_rows[window_keys[i]] for i in known_positions]]
+        if new_vectors is not None:
+            window_embeddings[new_positions] = new_vectors
         
-    embeddings = []
-    batch_size = 10
+        keys.extend(window_keys)
+        embedded_windows.append(window_embeddings)
     
-    print(f"Generating embeddings for {len(chunks)} chunks...")
+    if not keys:
+        raise ValueError("No chunks provided for embedding")
     
-    for i in range(0, len(chunks), batch_size):
-        batch = chunks[i:i + batch_size]
-        try:
-            response = client.embeddings.create(model=AZURE_EMBEDDING, input=batch)
-            batch_embeddings = [np.array(d.embedding, dtype="float32") for d in response.data]
-            embeddings.extend(batch_embeddings)
-            print(f"   Processed batch {i//batch_size + 1}/{(len(chunks) + batch_size - 1)//batch_size}")
-        except Exception as e:
-            print(f"Error embedding batch {i//batch_size + 1}: {e}")
-            raise
+    embeddings = np.concatenate(embedded_windows, axis=0)
+    
+    # Free the previous build's vectors before the new cache is written
+    del cached_vectors
+    save_embedding_cache(keys, embeddings)
     
     return embeddings
 
-def build_index(chunks, embeddings):
-    # Build FAISS index from chunks and embeddings
-    if not chunks or not embeddings:
-        raise ValueError("No chunks or embeddings provided for indexing")
-    
-    if len(chunks) != len(embeddings):
-        raise ValueError(f"Mismatch: {len(chunks)} chunks vs {len(embeddings)} embeddings")
+def create_hnsw_index(vectors):
+    # HNSW graph index for approximate nearest neighbour search
+    dim = vectors.shape[1]
+    index = faiss.IndexHNSWFlat(dim, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+    index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+    index.add(vectors)
+    index.hnsw.efSearch = HNSW_EF_SEARCH
+    return index
+
+def create_ivfpq_index(vectors):
+    # IVF index with product-quantized residuals, trained on the vectors themselves
+    num_vectors, dim = vectors.shape
+    if num_vectors < 2 ** PQ_NBITS:
+        print(f"Only {num_vectors} vectors, need {2 ** PQ_NBITS} to train PQ. Falling back to HNSW.")
+        return create_hnsw_index(vectors)
+
+    # ~4*sqrt(N) lists, keeping the 39 training points per list k-means expects
+    nlist = max(1, min(int(4 * np.sqrt(num_vectors)), num_vectors // 39))
+    quantizer = faiss.IndexFlatIP(dim)
+    index = faiss.IndexIVFPQ(quantizer, dim, nlist, PQ_M, PQ_NBITS, faiss.METRIC_INNER_PRODUCT)
+    index.train(vectors)
+    index.add(vectors)
+    return index
+
+def create_sq_index(vectors, qtype):
+    # Exhaustive search over vectors stored at reduced precision (2x smaller
+    # for fp16, 4x for 8-bit); queries stay float32
+    index = faiss.IndexScalarQuantizer(vectors.shape[1], qtype, faiss.METRIC_INNER_PRODUCT)
+    # Learns per-dimension ranges for 8-bit, a no-op for fp16
+    index.train(vectors)
+    index.add(vectors)
+    return index
+
+def create_binary_index(vectors):
+    # 1 bit per dimension (sign of the component), searched by Hamming distance
+    codes = np.packbits(vectors > 0, axis=1)
+    index = faiss.IndexBinaryFlat(vectors.shape[1])
+    index.add(codes)
+    return index
+
+def build_index(embeddings, staged_chunks_path):
+    # Build FAISS index from embeddings and move the chunks written alongside them into place
+    if embeddings is None or len(embeddings) == 0:
+        raise ValueError("No embeddings provided for indexing")
         
-    print(f"Building FAISS index...")
-    dim = len(embeddings[0])
-    index = faiss.IndexFlatL2(dim)
-    index.add(np.vstack(embeddings))
+    print(f"Building FAISS index ({INDEX_TYPE})...")
+    vectors = np.ascontiguousarray(embeddings, dtype=np.float32)
+
+    # Normalize so inner product equals cosine similarity
+    faiss.normalize_L2(vectors)
 
     # Create directory if it doesn't exist
     os.makedirs(INDEX_PATH, exist_ok=True)
-    
-    # Save index
+
     index_path = os.path.join(INDEX_PATH, "faiss.index")
-    faiss.write_index(index, index_path)
-    print(f"Index saved to: {index_path}")
+    binary_index_path = os.path.join(INDEX_PATH, "faiss_binary.index")
+    vectors_path = os.path.join(INDEX_PATH, "embeddings.npy")
+
+    if INDEX_TYPE == "binary":
+        # Binary index and the FP32 vectors used to rescore its candidates; no FP32
+        # index is built, since search never uses it while the binary index exists
+        faiss.write_index_binary(create_binary_index(vectors), binary_index_path)
+        np.save(vectors_path, vectors)
+        print(f"Binary index saved to: {binary_index_path}")
+        stale_paths = (index_path,)
+    else:
+        if INDEX_TYPE == "ivfpq":
+            index = create_ivfpq_index(vectors)
+        elif INDEX_TYPE == "sq_fp16":
+            index = create_sq_index(vectors, faiss.ScalarQuantizer.QT_fp16)
+        elif INDEX_TYPE == "sq8":
+            index = create_sq_index(vectors, faiss.ScalarQuantizer.QT_8bit)
+        else:
+            index = create_hnsw_index(vectors)
+
+        # Save index
+        faiss.write_index(index, index_path)
+        print(f"Index saved to: {index_path}")
+        stale_paths = (binary_index_path, vectors_path)
+
+    # Remove leftovers from a previous build of the other kind so they are not picked up
+    for stale_path in stale_paths:
+        try:
+            os.remove(stale_path)
+        except FileNotFoundError:
+            pass
 
-    # Save chunks
-    chunks_path = os.path.join(INDEX_PATH, "chunks.jsonl")
-    with open(chunks_path, "w", encoding="utf-8") as f:
-        for chunk in chunks:
-            f.write(json.dumps({"text": chunk}) + "\n")
-    print(f"Chunks saved to: {chunks_path}")
+    # Save chunks (written during embedding, replaced only once the index exists)
+    os.replace(staged_chunks_path, CHUNKS_FILE)
+    print(f"Chunks saved to: {CHUNKS_FILE}")
 
-    print(f"Successfully indexed {len(chunks)} chunks. Saved to {INDEX_PATH}")
+    print(f"Successfully indexed {len(embeddings)} chunks. Saved to {INDEX_PATH}")
 
 if __name__ == "__main__":
     try:
         print("Starting FAISS index build with Azure OpenAI...")
         chunks = load_documents(INPUT_JSONL)
-        if chunks:
-            embeddings = embed_chunks(chunks)
-            build_index(chunks, embeddings)
+        first_chunk = next(chunks, None)
+        if first_chunk is not None:
+            os.makedirs(INDEX_PATH, exist_ok=True)
+            staged_chunks_path = CHUNKS_FILE + ".tmp"
+            with open(staged_chunks_path, "w", encoding="utf-8") as chunks_file:
+                embeddings = asyncio.run(embed_chunks(chain([first_chunk], chunks), chunks_file))
+            build_index(embeddings, staged_chunks_path)
         else:
             print("No valid chunks found in the input file.")
     except Exception as e:
@@ -6,9 +6,10 @@ This script scrapes banking-related information from various sources
 to keep the knowledge base updated with current information.
 """
 
-import requests
+import aiohttp
+import asyncio
+import hashlib
 import json
-import time
 import os
 import sys
 from bs4 import BeautifulSoup
@@ -24,28 +25,46 @@ def log_info(msg):
 def log_error(msg):
     print(f"ERROR: {msg}")
 
+# Key for scraped items that are refreshed in place (e.g. "Current Loan Rates")
+def source_key(item):
+    # Normalized title and source, so a new scrape replaces the older copy
+    return (item.get('title', '').strip().lower(), item.get('source', '').strip().lower())
+
+# Duplicate detection key
+def document_key(item):
+    # Hash of normalized title and content, so whitespace/case variants match
+    title = item.get('title', '').strip().lower()
+    content = item.get('content', '').strip().lower()
+    return hashlib.blake2b(f"{title}\x1f{content}".encode('utf-8'), digest_size=12).digest()
+
 class BankingDataScraper:
     # Scraper to get banking info from websites
     
     def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'})
+        self.headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
+        self.timeout = aiohttp.ClientTimeout(total=10)
+    
+    # Download a page
+    async def fetch_html(self, session, url):
+        # Fetch a page and return its raw HTML bytes (lxml detects the encoding)
+        async with session.get(url) as response:
+            response.raise_for_status()
+            return await response.read()
         
     # Get RBI notifications
-    def scrape_rbi_notifications(self):
+    async def scrape_rbi_notifications(self, session):
         # Get RBI notifications from their website
         try:
 
             # RBI notifications page URL
             url = "https://www.rbi.org.in/Scripts/NotificationUser.aspx"
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
+            html = await self.fetch_html(session, url)
             
-            soup = BeautifulSoup(response.text, 'html.parser')
+            soup = BeautifulSoup(html, 'lxml')
             notifications = []
             
             # Find notification links
-            links = soup.find_all('a', href=True)
+            links = soup.select('a[href]')
 
             #Only 10 is considered
             for link in links[:10]:  
@@ -66,16 +85,15 @@ class BankingDataScraper:
             return []
     
     # Get banking news
-    def scrape_banking_news(self):
+    async def scrape_banking_news(self, session):
         # Get banking news from MoneyControl
         try:
 
             # MoneyControl banking news URL
             url = "https://www.moneycontrol.com/news/business/banking-finance/"
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
+            html = await self.fetch_html(session, url)
             
-            soup = BeautifulSoup(response.text, 'html.parser')
+            soup = BeautifulSoup(html, 'lxml')
             news_items = []
             
             # Find news articles
@@ -100,16 +118,15 @@ class BankingDataScraper:
             return []
     
     # Get loan rates
-    def scrape_loan_rates(self):
+    async def scrape_loan_rates(self, session):
         # Get current loan rates
         try:
 
             # BankBazaar loan rates URL
             url = "https://www.bankbazaar.com/personal-loan.html"
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
+            html = await self.fetch_html(session, url)
             
-            soup = BeautifulSoup(response.text, 'html.parser')
+            soup = BeautifulSoup(html, 'lxml')
             rate_info = []
             
             # Extract rate information
@@ -134,16 +151,15 @@ class BankingDataScraper:
             return []
     
     # Get FD rates
-    def scrape_fd_rates(self):
+    async def scrape_fd_rates(self, session):
         # Get current Fixed Deposit rates
         try:
             
             # BankBazaar FD rates URL
             url = "https://www.bankbazaar.com/fixed-deposit.html"
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
+            html = await self.fetch_html(session, url)
             
-            soup = BeautifulSoup(response.text, 'html.parser')
+            soup = BeautifulSoup(html, 'lxml')
             fd_info = []
             
             # Extract FD rate information   
@@ -167,24 +183,24 @@ class BankingDataScraper:
             log_error(f"Error scraping FD rates: {e}")
             return []
     
+    # Get all data concurrently
+    async def scrape_all_data_async(self):
+        # Scrape every source at the same time (they are different hosts)
+        async with aiohttp.ClientSession(headers=self.headers, timeout=self.timeout) as session:
+            results = await asyncio.gather(
+                self.scrape_rbi_notifications(session),
+                self.scrape_banking_news(session),
+                self.scrape_loan_rates(session),
+                self.scrape_fd_rates(session),
+            )
+        return [item for items in results for item in items]
+    
     # Get all data
     def scrape_all_data(self):
         # Get all banking data from different sources
         log_info("Starting comprehensive banking data scraping...")
         
-        all_data = []
-        
-        # Scrape from different sources
-        all_data.extend(self.scrape_rbi_notifications())
-        time.sleep(2)
-        
-        all_data.extend(self.scrape_banking_news())
-        time.sleep(2)
-        
-        all_data.extend(self.scrape_loan_rates())
-        time.sleep(2)
-        
-        all_data.extend(self.scrape_fd_rates())
+        all_data = asyncio.run(self.scrape_all_data_async())
         
         log_info(f"Total scraped items: {len(all_data)}")
         return all_data
@@ -207,23 +223,34 @@ class BankingDataScraper:
         # Add new data to existing data
         try:
             existing_filepath = os.path.join("data", existing_file)
-            existing_data = []
             
             # Load existing data using reusable data processor
-            if os.path.exists(existing_filepath):
+            try:
                 existing_data = data_processor.load_jsonl(existing_filepath)
+            except FileNotFoundError:
+                existing_data = []
+            
+            # Drop existing items that this scrape refreshes (same title and source),
+            # so changing content like current rates replaces stale copies
+            refreshed = {source_key(item) for item in new_data}
+            kept_data = [item for item in existing_data if source_key(item) not in refreshed]
             
-            # Merge data (avoid duplicates)
-            existing_titles = {item.get('title', '') for item in existing_data}
-            unique_new_data = [item for item in new_data if item.get('title', '') not in existing_titles]
+            # Merge data (avoid duplicates, including repeats within the new data)
+            seen_keys = {document_key(item) for item in kept_data}
+            unique_new_data = []
+            for item in new_data:
+                key = document_key(item)
+                if key not in seen_keys:
+                    seen_keys.add(key)
+                    unique_new_data.append(item)
             
             # Combine data
-            combined_data = existing_data + unique_new_data
+            combined_data = kept_data + unique_new_data
             
             # Save back to file using reusable data processor
             data_processor.save_jsonl(combined_data, existing_filepath)
             
-            log_info(f"Merged {len(unique_new_data)} new items with existing data. Total: {len(combined_data)}")
+            log_info(f"Merged {len(unique_new_data)} new items with existing data, replacing {len(existing_data) - len(kept_data)}. Total: {len(combined_data)}")
             
         except Exception as e:
             log_error(f"Error merging data: {e}")
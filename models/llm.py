@@ -1,4 +1,6 @@
 import logging
+import threading
+from typing import Iterator, Union
 from openai import AzureOpenAI
 from config.config import (
     AZURE_CHAT_COMPLETION_API_KEY, 
@@ -8,28 +10,61 @@ from config.config import (
     validate_config
 )
 
+# Azure OpenAI client, created on first use so its connection pool is reused
+_client = None
+_client_lock = threading.Lock()
+
 # Initialize Azure OpenAI client with error handling
 def get_azure_client():
     """
-    Get Azure OpenAI client with proper error handling.
+    Get the shared Azure OpenAI client, creating it on first use.
     
     Returns:
         AzureOpenAI: Configured client or None if configuration is invalid
     """
-    try:
-        # Validate configuration
-        validate_config()
+    global _client
+    if _client is not None:
+        return _client
+
+    # Streamlit sessions run on separate threads, so create the client only once
+    with _client_lock:
+        if _client is not None:
+            return _client
+
+        try:
+            # Validate configuration
+            validate_config()
+            
+            _client = AzureOpenAI(
+                api_key=AZURE_CHAT_COMPLETION_API_KEY,
+                api_version=AZURE_CHAT_COMPLETION_VERSION,
+                azure_endpoint=AZURE_CHAT_COMPLETION_ENDPOINT
+            )
+            return _client
+        except Exception as e:
+            logging.error(f"Failed to initialize Azure OpenAI client: {e}")
+            return None
+
+def stream_deltas(response) -> Iterator[str]:
+    """
+    Yield text deltas from a streamed chat completion.
+    
+    Args:
+        response: Streamed chat completion response
         
-        return AzureOpenAI(
-            api_key=AZURE_CHAT_COMPLETION_API_KEY,
-            api_version=AZURE_CHAT_COMPLETION_VERSION,
-            azure_endpoint=AZURE_CHAT_COMPLETION_ENDPOINT
-        )
+    Yields:
+        str: Text fragments as they arrive
+    """
+    try:
+        for chunk in response:
+            # Azure sends content-filter chunks without choices
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
     except Exception as e:
-        logging.error(f"Failed to initialize Azure OpenAI client: {e}")
-        return None
+        logging.exception("LLM streaming failed")
+        yield f"Error from LLM: {str(e)}"
 
-def generate_llm(prompt: str, mode: str = "detailed", stream: bool = False) -> str:
+def generate_llm(prompt: str, mode: str = "detailed", stream: bool = False) -> Union[str, Iterator[str]]:
     """
     Generate LLM response using Azure OpenAI API.
     
@@ -39,13 +74,15 @@ def generate_llm(prompt: str, mode: str = "detailed", stream: bool = False) -> s
         stream (bool): Whether to stream the response
         
     Returns:
-        str: Generated response or error message
+        str: Generated response or error message, or an iterator of text
+        fragments when stream is True
     """
 
     # Validating the configuration
     client = get_azure_client()
     if client is None:
-        return "Error: Azure OpenAI configuration is invalid. Please check your .env file and ensure all required variables are set."
+        error = "Error: Azure OpenAI configuration is invalid. Please check your .env file and ensure all required variables are set."
+        return iter([error]) if stream else error
 
     try:
 
@@ -74,15 +111,11 @@ def generate_llm(prompt: str, mode: str = "detailed", stream: bool = False) -> s
         )
 
         if stream:
-            full_response = ""
-            for chunk in response:
-                delta = chunk.choices[0].delta.content
-                if delta:
-                    full_response += delta
-            return full_response.strip()
+            return stream_deltas(response)
 
         return response.choices[0].message.content.strip()
 
     except Exception as e:
         logging.exception("LLM generation failed")
-        return f"Error from LLM: {str(e)}"
+        error = f"Error from LLM: {str(e)}"
+        return iter([error]) if stream else error
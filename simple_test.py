@@ -4,8 +4,11 @@
 
 import os
 import json
-import ast
+import py_compile
+import re
 import sys
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 # Add the current directory to the Python path to find utils module
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -13,6 +16,16 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 # Import reusable utilities from common_utils
 from utils.common_utils import data_processor, config_validator
 
+# Package name at the start of a requirement line (before ==, >=, [extras], ...)
+REQUIREMENT_NAME = re.compile(r'^[A-Za-z0-9_.\-]+')
+
+def find_missing_names(content, names):
+    # Find which names never appear in content with one regex pass.
+    # Longest names go first so AZURE_EMBEDDING does not shadow AZURE_EMBEDDING_ENDPOINT.
+    pattern = re.compile('|'.join(re.escape(name) for name in sorted(names, key=len, reverse=True)))
+    found = set(pattern.findall(content))
+    return [name for name in names if name not in found]
+
 def test_file_structure():
     # Test 1: Check if all required files exist
     print("Testing file structure...")
@@ -32,9 +45,25 @@ def test_file_structure():
         "README.md"                  # Documentation
     ]
     
+    # Group files by directory so each directory is listed once with scandir
+    expected_by_dir = defaultdict(set)
+    for file_path in essential_files:
+        expected_by_dir[os.path.dirname(file_path) or "."].add(os.path.basename(file_path))
+    
+    def list_directory(directory):
+        try:
+            with os.scandir(directory) as entries:
+                return {entry.name for entry in entries}
+        except FileNotFoundError:
+            return set()
+    
+    # Listing is I/O-bound, so threads overlap the waits on slow filesystems
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        present_by_dir = dict(zip(expected_by_dir, executor.map(list_directory, expected_by_dir)))
+    
     missing_files = []
     for file_path in essential_files:
-        if os.path.exists(file_path):
+        if os.path.basename(file_path) in present_by_dir[os.path.dirname(file_path) or "."]:
             print(f"PASS: {file_path}")
         else:
             print(f"FAIL: {file_path} - Missing!")
@@ -78,8 +107,7 @@ def test_banking_data():
             print(f"      Content: {sample.get('content', 'No content')[:80]}...")
             
             # Check data quality
-            titles = [doc.get('title', '') for doc in documents]
-            unique_titles = set(titles)
+            unique_titles = {doc.get('title', '') for doc in documents}
             print(f"   Data quality: {len(unique_titles)} unique titles out of {len(documents)} documents")
         
         return validation_results['valid_documents'] > 0
@@ -112,10 +140,7 @@ def test_config_structure():
             "AZURE_EMBEDDING_VERSION"
         ]
         
-        missing_vars = []
-        for var in required_vars:
-            if var not in content:
-                missing_vars.append(var)
+        missing_vars = find_missing_names(content, required_vars)
         
         if missing_vars:
             print(f"FAIL: Missing configuration variables: {', '.join(missing_vars)}")
@@ -143,15 +168,18 @@ def test_requirements():
             "openai",         # Azure OpenAI integration
             "faiss-cpu",      # Vector search
             "numpy",          # Numerical computing
-            "requests",       # HTTP requests
+            "aiohttp",        # HTTP requests
             "beautifulsoup4", # Web scraping
             "python-dotenv"   # Environment variables
         ]
         
-        missing_packages = []
-        for package in essential_packages:
-            if not any(package in req for req in requirements):
-                missing_packages.append(package)
+        # Parse each requirement once, then check packages by set membership
+        listed_packages = set()
+        for req in requirements:
+            match = REQUIREMENT_NAME.match(req)
+            if match:
+                listed_packages.add(match.group(0).lower())
+        missing_packages = [package for package in essential_packages if package.lower() not in listed_packages]
         
         if missing_packages:
             print(f"FAIL: Missing packages: {', '.join(missing_packages)}")
@@ -182,10 +210,7 @@ def test_env_template():
             "AZURE_EMBEDDING_ENDPOINT"
         ]
         
-        missing_vars = []
-        for var in required_vars:
-            if var not in content:
-                missing_vars.append(var)
+        missing_vars = find_missing_names(content, required_vars)
         
         if missing_vars:
             print(f"FAIL: Missing variables in template: {', '.join(missing_vars)}")
@@ -199,6 +224,17 @@ def test_env_template():
         print(f"FAIL: Error reading env template: {e}")
         return False
 
+def _check_syntax(file_path):
+    # Compile one file (bytecode goes to __pycache__ for later imports).
+    # Returns (file_path, error message or None).
+    try:
+        py_compile.compile(file_path, doraise=True, quiet=1)
+        return file_path, None
+    except py_compile.PyCompileError as e:
+        return file_path, f"Syntax error: {e}"
+    except Exception as e:
+        return file_path, f"Error: {e}"
+
 def test_python_syntax():
     """Test 6: Validate Python syntax (Code quality)"""
     print("\nTesting Python syntax...")
@@ -213,21 +249,16 @@ def test_python_syntax():
         "data/met_scraper.py"
     ]
     
+    # Compile files in parallel worker processes, report in the main process
+    with ProcessPoolExecutor() as executor:
+        results = list(executor.map(_check_syntax, python_files))
+    
     syntax_errors = []
-    for file_path in python_files:
-        try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                content = f.read()
-            
-            # Try to parse the Python code
-            ast.parse(content)
+    for file_path, error in results:
+        if error is None:
             print(f"PASS: {file_path} - Valid syntax")
-            
-        except SyntaxError as e:
-            print(f"FAIL: {file_path} - Syntax error: {e}")
-            syntax_errors.append(file_path)
-        except Exception as e:
-            print(f"FAIL: {file_path} - Error: {e}")
+        else:
+            print(f"FAIL: {file_path} - {error}")
             syntax_errors.append(file_path)
     
     if syntax_errors:
@@ -5,7 +5,22 @@ Basic tests for intern-level understanding
 """
 
 import os
-import json
+import orjson
+
+# Bytes read per step when loading JSONL files
+READ_CHUNK_SIZE = 1 << 20
+
+def iter_jsonl_lines(path):
+    """Yield the raw lines of a file, splitting 1 MB blocks on newlines."""
+    remainder = b""
+    with open(path, "rb") as f:
+        while block := f.read(READ_CHUNK_SIZE):
+            lines = (remainder + block).split(b"\n")
+            # The last piece may be a partial line, so carry it into the next block
+            remainder = lines.pop()
+            yield from lines
+    if remainder:
+        yield remainder
 
 def main():
     """Run basic tests for the banking assistant."""
@@ -34,14 +49,14 @@ def main():
     # Test 2: Check banking data
     print("\nChecking banking data...")
     try:
-        with open("data/banking_documents.jsonl", "r", encoding="utf-8") as f:
-            documents = []
-            for line in f:
-                try:
-                    doc = json.loads(line.strip())
-                    documents.append(doc)
-                except json.JSONDecodeError:
-                    continue
+        documents = []
+        for line in iter_jsonl_lines("data/banking_documents.jsonl"):
+            if not line:
+                continue
+            try:
+                documents.append(orjson.loads(line))
+            except orjson.JSONDecodeError:
+                continue
         
         print(f"PASS: Found {len(documents)} banking documents")
         if documents:
@@ -6,43 +6,68 @@ This module contains reusable functions and classes that can be used throughout
 import os
 import json
 import logging
-from typing import List, Dict, Optional, Any
-from datetime import datetime
+import orjson
+from typing import List, Dict, Iterable, Iterator, Optional, Any
+from collections import OrderedDict
+from functools import lru_cache
 import re
+import time
+import threading
+
+# Optional: single-pass keyword matching in TextProcessor.extract_keywords
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# Patterns used by TextProcessor.clean_text
+_WHITESPACE_RE = re.compile(r'\s+')
+_SPECIAL_CHARS_RE = re.compile(r'[^\w\s\.\,\!\?\-\:\;\(\)\[\]\{\}]')
 
 
 class DataProcessor:
     """Utility class for data processing operations."""
     
     @staticmethod
-    def load_jsonl(file_path: str) -> List[Dict[str, Any]]:
+    def iter_jsonl(file_path: str) -> Iterator[Dict[str, Any]]:
         """
-        Load data from a JSONL file.
+        Stream data from a JSONL file one record at a time.
         
         Args:
             file_path: Path to the JSONL file
             
-        Returns:
-            List of dictionaries loaded from the file
+        Yields:
+            Dictionaries loaded from the file; invalid lines are skipped
             
         Raises:
             FileNotFoundError: If the file doesn't exist
-            json.JSONDecodeError: If the file contains invalid JSON
         """
-        if not os.path.exists(file_path):
-            raise FileNotFoundError(f"File not found: {file_path}")
-        
-        data = []
-        with open(file_path, 'r', encoding='utf-8') as file:
+        # Binary mode lets orjson decode UTF-8 itself
+        with open(file_path, 'rb') as file:
             for line_num, line in enumerate(file, 1):
                 line = line.strip()
                 if line:
                     try:
-                        data.append(json.loads(line))
-                    except json.JSONDecodeError as e:
+                        yield orjson.loads(line)
+                    except orjson.JSONDecodeError as e:
                         logging.warning(f"Invalid JSON on line {line_num}: {e}")
                         continue
-        return data
+    
+    @classmethod
+    def load_jsonl(cls, file_path: str) -> List[Dict[str, Any]]:
+        """
+        Load data from a JSONL file.
+        
+        Args:
+            file_path: Path to the JSONL file
+            
+        Returns:
+            List of dictionaries loaded from the file
+            
+        Raises:
+            FileNotFoundError: If the file doesn't exist
+        """
+        return list(cls.iter_jsonl(file_path))
     
     @staticmethod
     def save_jsonl(data: List[Dict[str, Any]], file_path: str) -> None:
@@ -59,18 +84,18 @@ class DataProcessor:
                 file.write(json.dumps(item, ensure_ascii=False) + '\n')
     
     @staticmethod
-    def validate_banking_data(data: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def validate_banking_data(data: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
         """
-        Validate banking data format and quality.
+        Validate banking data format and quality in a single pass.
         
         Args:
-            data: List of banking documents to validate
+            data: Banking documents to validate (a list or a stream such as iter_jsonl)
             
         Returns:
             Dictionary with validation results
         """
         validation_results = {
-            'total_documents': len(data),
+            'total_documents': 0,
             'valid_documents': 0,
             'invalid_documents': 0,
             'missing_title': 0,
@@ -80,29 +105,43 @@ class DataProcessor:
         }
         
         for i, doc in enumerate(data):
+            validation_results['total_documents'] += 1
+            
             if not isinstance(doc, dict):
                 validation_results['invalid_documents'] += 1
                 validation_results['errors'].append(f"Document {i}: Not a dictionary")
                 continue
             
-            if 'title' not in doc:
+            title = doc.get('title')
+            content = doc.get('content')
+            
+            if title is None:
                 validation_results['missing_title'] += 1
                 validation_results['errors'].append(f"Document {i}: Missing title")
             
-            if 'content' not in doc:
+            if content is None:
                 validation_results['missing_content'] += 1
                 validation_results['errors'].append(f"Document {i}: Missing content")
-            
-            if 'content' in doc and not doc['content'].strip():
+            elif not content or content.isspace():
+                # isspace() tests for blank content without building a stripped copy
                 validation_results['empty_content'] += 1
                 validation_results['errors'].append(f"Document {i}: Empty content")
-            
-            if 'title' in doc and 'content' in doc and doc['content'].strip():
+            elif title is not None:
                 validation_results['valid_documents'] += 1
         
         return validation_results
 
 
+@lru_cache(maxsize=32)
+def _keyword_automaton(keywords: tuple) -> Any:
+    """Build an Aho-Corasick automaton matching the lower-cased keywords."""
+    automaton = ahocorasick.Automaton()
+    for keyword in keywords:
+        automaton.add_word(keyword, keyword)
+    automaton.make_automaton()
+    return automaton
+
+
 class TextProcessor:
     """Utility class for text processing operations."""
     
@@ -121,12 +160,10 @@ class TextProcessor:
             return ""
         
         # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text.strip())
+        text = _WHITESPACE_RE.sub(' ', text.strip())
         
         # Remove special characters that might cause issues
-        text = re.sub(r'[^\w\s\.\,\!\?\-\:\;\(\)\[\]\{\}]', '', text)
-        
-        return text
+        return _SPECIAL_CHARS_RE.sub('', text)
     
     @staticmethod
     def chunk_text(text: str, chunk_size: int = 1000, overlap: int = 200) -> List[str]:
@@ -179,14 +216,17 @@ class TextProcessor:
         Returns:
             List of found keywords
         """
-        found_keywords = []
         text_lower = text.lower()
+        lowered = [keyword.lower() for keyword in keywords]
         
-        for keyword in keywords:
-            if keyword.lower() in text_lower:
-                found_keywords.append(keyword)
+        if ahocorasick is not None and all(lowered):
+            # One pass over the text finds every keyword, including overlapping ones
+            automaton = _keyword_automaton(tuple(sorted(set(lowered))))
+            matched = {match for _, match in automaton.iter(text_lower)}
+        else:
+            matched = {keyword for keyword in lowered if keyword in text_lower}
         
-        return found_keywords
+        return [keyword for keyword, lower in zip(keywords, lowered) if lower in matched]
 
 
 class ConfigValidator:
@@ -225,16 +265,22 @@ class ConfigValidator:
 class Cache:
     """Simple in-memory cache utility for query responses."""
     
-    def __init__(self, max_size: int = 1000):
+    def __init__(self, max_size: int = 1000, ttl: Optional[float] = None):
         """
         Initialize cache.
         
         Args:
             max_size: Maximum number of items in cache
+            ttl: Seconds an item stays valid, or None to keep items until evicted
         """
         self.max_size = max_size
-        self.cache = {}
-        self.access_times = {}
+        self.ttl = ttl
+        # Ordered from least to most recently used
+        self.cache = OrderedDict()
+        # Expiry time of each item, only used when ttl is set
+        self.expires = {}
+        # Shared across retrieval/web search threads and Streamlit sessions
+        self._lock = threading.Lock()
     
     def get(self, key: str) -> Optional[Any]:
         """
@@ -244,12 +290,17 @@ class Cache:
             key: Cache key
             
         Returns:
-            Cached value or None if not found
+            Cached value or None if not found or expired
         """
-        if key in self.cache:
-            self.access_times[key] = datetime.now()
-            return self.cache[key]
-        return None
+        with self._lock:
+            if key in self.cache:
+                if self.ttl is not None and time.monotonic() >= self.expires[key]:
+                    del self.cache[key]
+                    del self.expires[key]
+                    return None
+                self.cache.move_to_end(key)
+                return self.cache[key]
+            return None
     
     def set(self, key: str, value: Any) -> None:
         """
@@ -259,19 +310,33 @@ class Cache:
             key: Cache key
             value: Value to cache
         """
-        if len(self.cache) >= self.max_size:
-            # Remove least recently used item
-            oldest_key = min(self.access_times.keys(), key=lambda k: self.access_times[k])
-            del self.cache[oldest_key]
-            del self.access_times[oldest_key]
+        with self._lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+            self.cache[key] = value
+            if self.ttl is not None:
+                self.expires[key] = time.monotonic() + self.ttl
+            
+            if len(self.cache) > self.max_size:
+                # Remove least recently used item
+                oldest_key, _ = self.cache.popitem(last=False)
+                self.expires.pop(oldest_key, None)
+    
+    def items(self) -> List[tuple]:
+        """
+        Get a snapshot of cached items.
         
-        self.cache[key] = value
-        self.access_times[key] = datetime.now()
+        Returns:
+            List of (key, value) pairs
+        """
+        with self._lock:
+            return list(self.cache.items())
     
     def clear(self) -> None:
         """Clear all cached items."""
-        self.cache.clear()
-        self.access_times.clear()
+        with self._lock:
+            self.cache.clear()
+            self.expires.clear()
     
     def size(self) -> int:
         """
@@ -283,8 +348,98 @@ class Cache:
         return len(self.cache)
 
 
+class SemanticCache:
+    """Approximate cache that matches queries by embedding similarity."""
+    
+    def __init__(self, max_size: int = 512, threshold: float = 0.95):
+        """
+        Initialize semantic cache.
+        
+        Args:
+            max_size: Maximum number of items in cache
+            threshold: Minimum cosine similarity for a cache hit
+        """
+        self.max_size = max_size
+        self.threshold = threshold
+        self.index = None
+        self.values = []
+        # Shared by retrieval threads and Streamlit sessions; the index ids and
+        # self.values must change together
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _prepare(embedding: Any) -> Any:
+        """Return the embedding as a normalized float32 row vector."""
+        import faiss
+        import numpy as np
+        
+        vector = np.array(embedding, dtype="float32").reshape(1, -1)
+        faiss.normalize_L2(vector)
+        return vector
+    
+    def get(self, embedding: Any) -> Optional[Any]:
+        """
+        Get the value cached for the most similar embedding.
+        
+        Args:
+            embedding: Query embedding
+            
+        Returns:
+            Cached value or None if no entry is similar enough
+        """
+        vector = self._prepare(embedding)
+        with self._lock:
+            if self.index is None or self.index.ntotal == 0:
+                return None
+            
+            scores, ids = self.index.search(vector, 1)
+            if ids[0][0] >= 0 and scores[0][0] >= self.threshold:
+                return self.values[ids[0][0]]
+            return None
+    
+    def set(self, embedding: Any, value: Any) -> None:
+        """
+        Set value in cache for an embedding.
+        
+        Args:
+            embedding: Query embedding
+            value: Value to cache
+        """
+        import faiss
+        import numpy as np
+        
+        vector = self._prepare(embedding)
+        with self._lock:
+            if self.index is None:
+                self.index = faiss.IndexFlatIP(vector.shape[1])
+            
+            if self.index.ntotal >= self.max_size:
+                # Remove oldest item, remaining ids shift down to match self.values
+                self.index.remove_ids(np.array([0], dtype="int64"))
+                self.values.pop(0)
+            
+            self.index.add(vector)
+            self.values.append(value)
+    
+    def clear(self) -> None:
+        """Clear all cached items."""
+        with self._lock:
+            self.index = None
+            self.values.clear()
+    
+    def size(self) -> int:
+        """
+        Get current cache size.
+        
+        Returns:
+            Number of items in cache
+        """
+        return len(self.values)
+
+
 # Global instances for easy access
 data_processor = DataProcessor()
 text_processor = TextProcessor()
 config_validator = ConfigValidator()
-cache = Cache() 
\ No newline at end of file
+cache = Cache()
+semantic_cache = SemanticCache() 
\ No newline at end of file
@@ -1,8 +1,13 @@
 import os
-import json
+import mmap
+import atexit
+import hashlib
 import faiss
 import numpy as np
 import logging
+import threading
+import orjson
+from typing import List, Union
 from openai import AzureOpenAI
 from config.config import (
     AZURE_EMBEDDING_API_KEY,
@@ -11,67 +16,353 @@ from config.config import (
     AZURE_EMBEDDING,
     validate_config,
 )
+from utils.common_utils import cache, semantic_cache
 
 # Paths to FAISS index and stored chunks
 INDEX_PATH = "faiss_index"
 CHUNKS_FILE = os.path.join(INDEX_PATH, "chunks.jsonl")
+OFFSETS_FILE = os.path.join(INDEX_PATH, "chunks.offsets.npz")
 INDEX_FILE = os.path.join(INDEX_PATH, "faiss.index")
+BINARY_INDEX_FILE = os.path.join(INDEX_PATH, "faiss_binary.index")
+VECTORS_FILE = os.path.join(INDEX_PATH, "embeddings.npy")
+QUERY_CACHE_FILE = os.path.join(INDEX_PATH, "query_embeddings.npz")
+
+# Number of inverted lists probed per query for IVF indexes
+IVF_NPROBE = 16
+
+# Hamming candidates fetched per requested result before FP32 rescoring
+RESCORE_FACTOR = 10
+
+# Prefix for query embeddings in the shared cache, and new embeddings between saves
+QUERY_CACHE_PREFIX = "embed_"
+QUERY_CACHE_SAVE_EVERY = 20
+_unsaved_query_embeddings = 0
+
+# Saved query embeddings are read on the first embedding request
+_query_cache_loaded = False
+_query_cache_lock = threading.Lock()
+
+# Azure OpenAI client, created on first use so its connection pool is reused
+_client = None
+_client_lock = threading.Lock()
 
 # Initializing Azure OpenAI client with error handling
 def get_azure_client():
     """
-    Get Azure OpenAI client with proper error handling.
+    Get the shared Azure OpenAI client, creating it on first use.
     
     Returns:
         AzureOpenAI: Configured client or None if configuration is invalid
     """
+    global _client
+    if _client is not None:
+        return _client
+
+    # Streamlit sessions run on separate threads, so create the client only once
+    with _client_lock:
+        if _client is not None:
+            return _client
+
+        try:
+            # Validate configuration
+            validate_config()
+            
+            _client = AzureOpenAI(
+                api_key=AZURE_EMBEDDING_API_KEY,
+                api_version=AZURE_EMBEDDING_VERSION,
+                azure_endpoint=AZURE_EMBEDDING_ENDPOINT,
+            )
+            return _client
+        except Exception as e:
+            logging.error(f"Failed to initialize Azure OpenAI client: {e}")
+            return None
+
+# Reading a FAISS index file
+def read_faiss_index(path: str, reader=faiss.read_index):
+    """
+    Read a FAISS index, reporting a missing file as FileNotFoundError.
+    
+    Args:
+        path (str): Index file path
+        reader: faiss.read_index or faiss.read_index_binary
+        
+    Returns:
+        The loaded index
+        
+    Raises:
+        FileNotFoundError: If the index file does not exist
+    """
     try:
-        # Validate configuration
-        validate_config()
+        return reader(path)
+    except RuntimeError:
+        # faiss raises RuntimeError for any I/O failure, including a missing file
+        if not os.path.exists(path):
+            raise FileNotFoundError(path) from None
+        raise
+
+# Memory-mapped view of chunks.jsonl, decoding chunks only when retrieved
+class ChunkStore:
+    """Read-only access to stored text chunks by position."""
+    
+    def __init__(self, chunks_file: str, offsets_file: str):
+        """
+        Open the chunks file and load (or build) its line offsets.
         
-        return AzureOpenAI(
-            api_key=AZURE_EMBEDDING_API_KEY,
-            api_version=AZURE_EMBEDDING_VERSION,
-            azure_endpoint=AZURE_EMBEDDING_ENDPOINT,
-        )
-    except Exception as e:
-        logging.error(f"Failed to initialize Azure OpenAI client: {e}")
-        return None
+        Args:
+            chunks_file (str): Path to chunks.jsonl
+            offsets_file (str): Path to the cached byte offsets of its lines
+            
+        Raises:
+            FileNotFoundError: If the chunks file does not exist
+        """
+        with open(chunks_file, "rb") as f:
+            stat = os.fstat(f.fileno())
+            # mmap cannot map an empty file
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if stat.st_size else b""
+            self.offsets = self._load_offsets(f, stat, offsets_file)
+    
+    @staticmethod
+    def _load_offsets(f, stat: os.stat_result, offsets_file: str) -> np.ndarray:
+        """
+        Load line offsets, rebuilding them if chunks.jsonl changed since they were saved.
+        
+        The offsets file records the inode, size and mtime (ns) of the chunks file it was
+        built from; os.replace gives a rebuilt chunks.jsonl a new inode even when its size
+        and mtime happen to match.
+        
+        Returns:
+            np.ndarray: int64 start offset of every line followed by the file size
+        """
+        signature = np.array([stat.st_ino, stat.st_size, stat.st_mtime_ns], dtype=np.uint64)
+        try:
+            with np.load(offsets_file) as saved:
+                if np.array_equal(saved["signature"], signature):
+                    return saved["offsets"]
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable chunk offsets: {e}")
+        
+        offsets = [0]
+        f.seek(0)
+        for line in f:
+            offsets.append(offsets[-1] + len(line))
+        offsets = np.array(offsets, dtype=np.int64)
+        
+        try:
+            tmp_file = offsets_file + ".tmp"
+            with open(tmp_file, "wb") as out:
+                np.savez(out, offsets=offsets, signature=signature)
+            os.replace(tmp_file, offsets_file)
+        except OSError as e:
+            logging.warning(f"Could not save chunk offsets: {e}")
+        return offsets
+    
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+    
+    def get_chunk(self, i: int) -> str:
+        """
+        Decode a single chunk.
+        
+        Args:
+            i (int): Chunk position
+            
+        Returns:
+            str: Chunk text
+        """
+        return orjson.loads(self._mm[self.offsets[i]:self.offsets[i + 1]])["text"]
+    
+    def get_chunks(self, ids) -> List[str]:
+        """
+        Decode several chunks.
+        
+        Args:
+            ids: Chunk positions
+            
+        Returns:
+            List[str]: Chunk texts in the order of ids
+        """
+        return [self.get_chunk(i) for i in ids]
 
 # Loading FAISS index and text chunks
-def load_index_and_chunks():
+def load_index_and_chunks(load_index: bool = True):
     """
     Load the FAISS index and text chunks from disk.
     
+    Args:
+        load_index (bool): Whether to read faiss.index (not needed when the
+            binary index is searched instead)
+    
     Returns:
-        tuple: (index, chunks) - FAISS index and list of text chunks
+        tuple: (index, chunks) - FAISS index (None if not loaded) and
+        ChunkStore of text chunks
         
     Raises:
         FileNotFoundError: If index or chunks file not found
     """
-    if not os.path.exists(INDEX_FILE) or not os.path.exists(CHUNKS_FILE):
-        raise FileNotFoundError("FAISS index or chunks.jsonl not found. Please run build_faiss_index.py first.")
-
     try:
-        index = faiss.read_index(INDEX_FILE)
-        with open(CHUNKS_FILE, "r", encoding="utf-8") as f:
-            chunks = [json.loads(line)["text"] for line in f]
+        chunks = ChunkStore(CHUNKS_FILE, OFFSETS_FILE)
+        if not load_index:
+            return None, chunks
+        index = read_faiss_index(INDEX_FILE)
+        if hasattr(index, "nprobe"):
+            index.nprobe = IVF_NPROBE
         return index, chunks
+    except FileNotFoundError as e:
+        raise FileNotFoundError("FAISS index or chunks.jsonl not found. Please run build_faiss_index.py first.") from e
     except Exception as e:
         logging.error(f"Error loading index and chunks: {e}")
         raise
 
-# Loading index and chunks at module level
-try:
-    index, chunks = load_index_and_chunks()
-except Exception as e:
-    logging.error(f"Failed to load index and chunks: {e}")
-    index, chunks = None, []
+# Loading the optional binary index used for quantized search
+def load_binary_index():
+    """
+    Load the binary index and the FP32 vectors used to rescore its results.
+    
+    Returns:
+        tuple: (binary_index, vectors) or (None, None) if the index was not built
+    """
+    try:
+        vectors = np.load(VECTORS_FILE, mmap_mode="r")
+        binary_index = read_faiss_index(BINARY_INDEX_FILE, faiss.read_index_binary)
+        return binary_index, vectors
+    except FileNotFoundError:
+        # Index was built without INDEX_TYPE = "binary"
+        return None, None
+    except Exception as e:
+        logging.error(f"Error loading binary index: {e}")
+        return None, None
+
+# Index and chunks, loaded on the first search rather than at import
+_state = {}
+_state_lock = threading.Lock()
+
+def _get_state():
+    """
+    Get the loaded search state, loading it on first use.
+    
+    Returns:
+        dict: index, chunks, binary_index and vectors (index and chunks are
+        None if loading failed; index is also None when the binary index is used)
+    """
+    if _state:
+        return _state
+
+    with _state_lock:
+        if _state:
+            return _state
+
+        # The FP32 index is only needed when there is no binary index to search
+        binary_index, vectors = load_binary_index()
+        try:
+            index, chunks = load_index_and_chunks(load_index=binary_index is None)
+        except Exception as e:
+            logging.error(f"Failed to load index and chunks: {e}")
+            index, chunks = None, None
+        _state.update(index=index, chunks=chunks, binary_index=binary_index, vectors=vectors)
+        return _state
+
+# Persisting query embeddings across restarts
+def load_query_cache():
+    """
+    Load query embeddings saved by earlier runs into the shared cache.
+    """
+    try:
+        with np.load(QUERY_CACHE_FILE) as saved:
+            if str(saved["model"]) != AZURE_EMBEDDING:
+                return
+            for key, embedding in zip(saved["keys"], saved["embeddings"]):
+                cache.set(str(key), embedding)
+    except FileNotFoundError:
+        return
+    except Exception as e:
+        logging.warning(f"Could not load query embedding cache: {e}")
+
+def save_query_cache():
+    """
+    Save the query embeddings currently in the shared cache to disk.
+    """
+    entries = [(key, value) for key, value in cache.items() if key.startswith(QUERY_CACHE_PREFIX)]
+    if not entries:
+        return
+
+    try:
+        np.savez(
+            QUERY_CACHE_FILE,
+            keys=np.array([key for key, _ in entries]),
+            embeddings=np.vstack([value for _, value in entries]),
+            model=np.array(AZURE_EMBEDDING),
+        )
+    except Exception as e:
+        logging.warning(f"Could not save query embedding cache: {e}")
+
+def _ensure_query_cache():
+    """
+    Load saved query embeddings on the first embedding request rather than at import.
+    """
+    global _query_cache_loaded
+    if _query_cache_loaded:
+        return
+
+    with _query_cache_lock:
+        if not _query_cache_loaded:
+            load_query_cache()
+            _query_cache_loaded = True
+
+atexit.register(save_query_cache)
+
+# Embedding queries using Azure OpenAI
+def embed_queries(queries: List[str]) -> np.ndarray:
+    """
+    Generate embeddings for several queries with one Azure OpenAI request,
+    reusing cached embeddings.
+    
+    Args:
+        queries (List[str]): Query texts to embed
+        
+    Returns:
+        np.ndarray: Query embeddings of shape (len(queries), dim)
+    """
+    global _unsaved_query_embeddings
+    _ensure_query_cache()
+    cache_keys = [
+        QUERY_CACHE_PREFIX + hashlib.blake2b(query.encode("utf-8"), digest_size=16).hexdigest()
+        for query in queries
+    ]
+    embeddings = [cache.get(key) for key in cache_keys]
+    missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+
+    if missing:
+        client = get_azure_client()
+        if client is None:
+            raise ValueError("Azure OpenAI client not available. Please check your configuration.")
+        
+        try:
+            response = client.embeddings.create(
+                input=[queries[i] for i in missing],
+                model=AZURE_EMBEDDING,
+            )
+        except Exception as e:
+            logging.error(f"Error embedding query: {e}")
+            raise
+
+        for i, data in zip(missing, response.data):
+            embeddings[i] = np.array(data.embedding, dtype="float32")
+            cache.set(cache_keys[i], embeddings[i])
+
+        _unsaved_query_embeddings += len(missing)
+        if _unsaved_query_embeddings >= QUERY_CACHE_SAVE_EVERY:
+            _unsaved_query_embeddings = 0
+            save_query_cache()
+
+    # np.vstack copies, so callers can normalize in place without touching the cache
+    return np.vstack(embeddings)
 
 # Embedding query using Azure OpenAI
 def embed_query(query: str) -> np.ndarray:
     """
-    Generate embedding for a query using Azure OpenAI.
+    Generate embedding for a query using Azure OpenAI, reusing cached embeddings.
     
     Args:
         query (str): Query text to embed
@@ -79,40 +370,90 @@ def embed_query(query: str) -> np.ndarray:
     Returns:
         np.ndarray: Query embedding
     """
-    client = get_azure_client()
-    if client is None:
-        raise ValueError("Azure OpenAI client not available. Please check your configuration.")
+    return embed_queries([query])[0]
+
+# Searching the binary index and rescoring candidates with FP32 vectors
+def search_binary_index(binary_index, vectors: np.ndarray, query_embeddings: np.ndarray, top_k: int) -> List[np.ndarray]:
+    """
+    Retrieve candidates by Hamming distance and rerank them by inner product.
     
-    try:
-        response = client.embeddings.create(
-            input=[query],
-            model=AZURE_EMBEDDING,
-        )
-        return np.array(response.data[0].embedding, dtype="float32")
-    except Exception as e:
-        logging.error(f"Error embedding query: {e}")
-        raise
+    Args:
+        binary_index: Binary FAISS index of sign-quantized vectors
+        vectors (np.ndarray): FP32 vectors used for rescoring
+        query_embeddings (np.ndarray): Normalized query embeddings of shape (n, dim)
+        top_k (int): Number of top results to return per query
+        
+    Returns:
+        List[np.ndarray]: Chunk ids ordered by similarity, one array per query
+    """
+    codes = np.packbits(query_embeddings > 0, axis=1)
+    _, candidates = binary_index.search(codes, top_k * RESCORE_FACTOR)
+
+    results = []
+    for query_embedding, row in zip(query_embeddings, candidates):
+        row = row[row >= 0]
+        scores = vectors[row] @ query_embedding
+        results.append(row[np.argsort(-scores)[:top_k]])
+    return results
 
 # Performing semantic search in the FAISS index
-def retrieve_similar_documents(query: str, top_k: int = 5):
+def retrieve_similar_documents(query: Union[str, List[str]], top_k: int = 5):
     """
     Retrieve similar documents using FAISS index and Azure OpenAI embeddings.
     
     Args:
-        query (str): Search query
+        query (Union[str, List[str]]): Search query, or several queries to
+            embed and search as one batch
         top_k (int): Number of top results to return
         
     Returns:
-        list: List of similar text chunks
+        list: List of similar text chunks, or one such list per query when
+        a list of queries is given
     """
-    if index is None or chunks is None:
-        return ["Error: FAISS index not loaded. Please run build_faiss_index.py first."]
+    single = isinstance(query, str)
+    queries = [query] if single else list(query)
+
+    state = _get_state()
+    index, chunks = state["index"], state["chunks"]
+    if chunks is None or (index is None and state["binary_index"] is None):
+        error = ["Error: FAISS index not loaded. Please run build_faiss_index.py first."]
+        return error if single else [error for _ in queries]
     
     try:
-        query_embedding = embed_query(query).reshape(1, -1)
-        distances, indices = index.search(query_embedding, top_k)
-        results = [chunks[idx] for idx in indices[0] if idx < len(chunks)]
-        return results if results else ["No relevant documents found."]
+        # C-contiguous float32 lets FAISS search the buffer without converting it
+        query_embeddings = np.ascontiguousarray(embed_queries(queries), dtype=np.float32)
+        # Index stores normalized vectors, so normalize the queries as well
+        faiss.normalize_L2(query_embeddings)
+
+        # Reuse context retrieved for near-identical earlier queries
+        results = [None] * len(queries)
+        pending = []
+        for i, query_embedding in enumerate(query_embeddings):
+            cached = semantic_cache.get(query_embedding)
+            if cached is not None and cached[0] >= top_k:
+                results[i] = cached[1][:top_k]
+            else:
+                pending.append(i)
+
+        if pending:
+            pending_embeddings = query_embeddings[pending]
+            if state["binary_index"] is not None:
+                id_rows = search_binary_index(state["binary_index"], state["vectors"], pending_embeddings, top_k)
+            else:
+                distances, id_rows = index.search(pending_embeddings, top_k)
+
+            for i, ids in zip(pending, id_rows):
+                # FAISS pads missing results with -1
+                ids = np.asarray(ids)
+                found = chunks.get_chunks(ids[(ids >= 0) & (ids < len(chunks))])
+                if found:
+                    semantic_cache.set(query_embeddings[i], (top_k, found))
+                    results[i] = found
+                else:
+                    results[i] = ["No relevant documents found."]
+
+        return results[0] if single else results
     except Exception as e:
         logging.error(f"Error in document retrieval: {e}")
-        return [f"Error retrieving documents: {str(e)}"]
+        error = [f"Error retrieving documents: {str(e)}"]
+        return error if single else [error for _ in queries]
@@ -1,12 +1,113 @@
-import requests
+import os
+import re
+import asyncio
+import logging
+import aiohttp
 import time
 import random
-from utils.common_utils import text_processor
+from bs4 import BeautifulSoup, SoupStrainer
+from lxml import html as lxml_html
+from utils.common_utils import text_processor, Cache
+
+logger = logging.getLogger(__name__)
+
+# Search result elements, visited lazily in document order
+SEARCH_RESULT_TAGS = ("a", "h3", "p", "div", "span")
+
+# Tags whose text is collected from news and RBI pages; those pages are parsed
+# with a SoupStrainer so only these tags (and their contents) are built into the tree
+ARTICLE_TEXT_TAGS = ["p", "h3", "div"]
+ARTICLE_TEXT_STRAINER = SoupStrainer(ARTICLE_TEXT_TAGS)
+
+# Banking words to look for in search results and news, each matched in one pass.
+# Substring matches like the old `in` checks, so "banking" still counts as "bank".
+_BANK_RE = re.compile(r"bank|rbi|loan|account|kyc|emi|fd|rd|rate|interest|savings|current|credit|debit|repo|monetary|policy|finance|investment|deposit|withdrawal|transfer|upi|neft|rtgs", re.IGNORECASE)
+_NEWS_RE = re.compile(r"rbi|bank|loan|rate|announces|new", re.IGNORECASE)
+
+def _accept(text, _search=_BANK_RE.search, _len=len):
+    # Snippet-sized text mentioning banking (defaults bind lookups as locals)
+    return 15 < _len(text) < 300 and _search(text) is not None
+
+# Cleaned snippets seen recently, so text repeated across pages and calls
+# (navigation, boilerplate) is kept as one string object
+INTERN_MAX_SIZE = 10000
+_interned = {}
+
+def _intern(text):
+    # Return the shared copy of text, starting over once the table is full
+    shared = _interned.get(text)
+    if shared is None:
+        if len(_interned) >= INTERN_MAX_SIZE:
+            _interned.clear()
+        _interned[text] = shared = text
+    return shared
+
+# Headers sent with every request
+_DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+}
+
+# Only the start of each page is parsed; results and headlines come well before this
+MAX_PAGE_BYTES = 256 * 1024
+
+def _client_session(timeout):
+    # One session per search, so its connections are shared by every source it queries
+    return aiohttp.ClientSession(headers=_DEFAULT_HEADERS, timeout=aiohttp.ClientTimeout(total=timeout))
+
+async def _fetch(session, method, url, **kwargs):
+    # Return the status and at most MAX_PAGE_BYTES of the decompressed body
+    async with session.request(method, url, **kwargs) as response:
+        body = bytearray()
+        async for chunk in response.content.iter_chunked(64 * 1024):
+            body += chunk
+            if len(body) >= MAX_PAGE_BYTES:
+                break
+        return response.status, bytes(body[:MAX_PAGE_BYTES])
+
+# Shown when no search source returned usable results
+NO_RESULTS_MESSAGE = "Sorry, couldn't find any banking info right now. Try asking about specific banking topics like 'savings account' or 'RBI repo rate'."
+
+# Recent search results, kept for 10 minutes so repeated questions skip the network
+search_cache = Cache(max_size=512, ttl=600)
+
+# The repo rate only changes at MPC meetings (every 6-8 weeks), so it is kept in
+# memory for an hour and on disk for a day, surviving app restarts
+REPO_RATE_FILE = os.path.join("data", ".repo_rate.txt")
+REPO_RATE_MAX_AGE = 24 * 3600
+repo_rate_cache = Cache(max_size=1, ttl=3600)
+
+def _load_repo_rate():
+    # Return the repo rate saved by an earlier run, or None if missing or stale
+    try:
+        if time.time() - os.path.getmtime(REPO_RATE_FILE) > REPO_RATE_MAX_AGE:
+            return None
+        with open(REPO_RATE_FILE, "r", encoding="utf-8") as f:
+            return f.read() or None
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning("REPO RATE SEARCH: Could not load saved rate: %s", e)
+        return None
+
+def _save_repo_rate(result):
+    # Keep a repo rate found on the RBI pages in memory and on disk
+    repo_rate_cache.set("repo_rate", result)
+    try:
+        with open(REPO_RATE_FILE, "w", encoding="utf-8") as f:
+            f.write(result)
+    except Exception as e:
+        logger.warning("REPO RATE SEARCH: Could not save rate: %s", e)
 
 # Search the web for banking info
-def live_web_search(query: str, num_results: int = 5) -> str:
+async def live_web_search_async(query: str, num_results: int = 5) -> str:
     # Look for banking stuff on the internet
-    print(f"WEB SEARCH: Looking for '{query}' on the web...")
+    logger.debug("WEB SEARCH: Looking for '%s' on the web...", query)
+    
+    cache_key = f"web:{num_results}:{query.strip().lower()}"
+    cached = search_cache.get(cache_key)
+    if cached is not None:
+        return cached
     
     # Websites to search
     search_sources = [
@@ -14,68 +115,86 @@ def live_web_search(query: str, num_results: int = 5) -> str:
         {"name": "DuckDuckGo Alternative", "url": "https://html.duckduckgo.com/html/", "method": "POST", "params": {"q": f"{query} banking India RBI"}}
     ]
     
+    async def fetch(session, source):
+        logger.debug("WEB SEARCH: Trying %s...", source['name'])
+        try:
+            if source["method"] == "POST":
+                return source, await _fetch(session, "POST", source["url"], data=source["params"])
+            return source, await _fetch(session, "GET", source["url"], params=source["params"])
+        except Exception as e:
+            return source, e
+    
     all_results = []
+    # Set mirror of all_results for constant-time duplicate checks
+    seen_results = set()
     
-    for source in search_sources:
+    # Query every source at once and handle responses as they arrive
+    async with _client_session(timeout=15) as session:
+        tasks = [asyncio.create_task(fetch(session, source)) for source in search_sources]
         try:
-            print(f"WEB SEARCH: Trying {source['name']}...")
-            
-            headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36", "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8"}
-            
-            if source["method"] == "POST":
-                response = requests.post(source["url"], data=source["params"], headers=headers, timeout=15)
-            else:
-                response = requests.get(source["url"], params=source["params"], headers=headers, timeout=15)
-            
-            print(f"WEB SEARCH: {source['name']} status: {response.status_code}")
-            
-            if response.status_code in [200, 202]:
-                from bs4 import BeautifulSoup
-                soup = BeautifulSoup(response.text, "html.parser")
-                
-                # HTML tags to look for
-                selectors = ["a", "h3", "p", "div", "span", "div.result__body", "div.result__snippet"]
-                
-                found_elements = []
-                for selector in selectors:
-                    elements = soup.select(selector)
-                    if elements:
-                        found_elements.extend(elements)
-                        print(f"WEB SEARCH: Found {len(elements)} elements with '{selector}'")
-                
-                # Get text from each element
-                for element in found_elements:
-                    text = element.get_text(strip=True)
-                    if text and len(text) > 15 and len(text) < 300:
-                        # Banking words to look for
-                        banking_keywords = ['bank', 'rbi', 'loan', 'account', 'kyc', 'emi', 'fd', 'rd', 'rate', 'interest', 'savings', 'current', 'credit', 'debit', 'repo', 'monetary', 'policy', 'finance', 'investment', 'deposit', 'withdrawal', 'transfer', 'upi', 'neft', 'rtgs']
+            for next_done in asyncio.as_completed(tasks):
+                source, outcome = await next_done
+                try:
+                    if isinstance(outcome, Exception):
+                        raise outcome
+                    status_code, body = outcome
+                    logger.debug("WEB SEARCH: %s status: %s", source['name'], status_code)
+                    
+                    if status_code in [200, 202]:
+                        # Raw bytes so lxml detects the page encoding itself
+                        root = lxml_html.fromstring(body)
                         
-                        if any(keyword in text.lower() for keyword in banking_keywords):
-                            clean_text = text_processor.clean_text(text)
-                            if clean_text not in all_results:
+                        # Get text from each element (text_content() keeps text of nested
+                        # tags, which a bare text() step would split into fragments).
+                        # iter() is lazy, so the walk stops as soon as there are enough results.
+                        clean = text_processor.clean_text
+                        for element in root.iter(*SEARCH_RESULT_TAGS):
+                            text = element.text_content().strip()
+                            if not _accept(text):
+                                continue
+                            
+                            clean_text = _intern(clean(text))
+                            if clean_text not in seen_results:
+                                seen_results.add(clean_text)
                                 all_results.append(clean_text)
-                                print(f"WEB SEARCH: Added result: {clean_text[:50]}...")
+                                logger.debug("WEB SEARCH: Added result: %s...", clean_text[:50])
+                                
+                                if len(all_results) >= num_results:
+                                    break
                         
-                        if len(all_results) >= num_results * 2:
+                        if len(all_results) >= num_results:
                             break
-                
-                if len(all_results) >= num_results:
-                    break
-                    
-        except Exception as e:
-            print(f"WEB SEARCH: Error with {source['name']}: {e}")
-            continue
+                            
+                except Exception as e:
+                    logger.warning("WEB SEARCH: Error with %s: %s", source['name'], e)
+                    continue
+        finally:
+            # Don't wait for slower sources once there are enough results
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
     
-    # Return results or fallback
+    # Return results, or an empty string so callers can tell nothing was found
     if all_results:
-        return "\n\n".join(all_results[:num_results])
+        result = "\n\n".join(all_results[:num_results])
+        search_cache.set(cache_key, result)
+        return result
     else:
-        return "Sorry, couldn't find any banking info right now. Try asking about specific banking topics like 'savings account' or 'RBI repo rate'."
+        return ""
+
+def live_web_search(query: str, num_results: int = 5) -> str:
+    # Synchronous wrapper for callers outside an event loop, with a message when nothing was found
+    return asyncio.run(live_web_search_async(query, num_results)) or NO_RESULTS_MESSAGE
 
 # Get latest banking news
-def search_banking_news(query: str = "Indian banking news RBI") -> str:
+async def search_banking_news_async(query: str = "Indian banking news RBI") -> str:
     # Get latest banking news
-    print(f"NEWS SEARCH: Looking for banking news...")
+    logger.debug("NEWS SEARCH: Looking for banking news...")
+    
+    cache_key = f"news:{query.strip().lower()}"
+    cached = search_cache.get(cache_key)
+    if cached is not None:
+        return cached
     
     # Some recent banking news (fallback)
     fallback_news = """
@@ -97,47 +216,82 @@ def search_banking_news(query: str = "Indian banking news RBI") -> str:
         {"name": "MoneyControl", "url": "https://www.moneycontrol.com/news/business/banking-finance/"}
     ]
     
+    async def fetch(session, source):
+        logger.debug("NEWS SEARCH: Trying %s...", source['name'])
+        try:
+            return source, await _fetch(session, "GET", source['url'])
+        except Exception as e:
+            return source, e
+    
     found_news = []
+    # Set mirror of found_news for constant-time duplicate checks
+    seen_news = set()
     
-    for source in news_sources:
+    # Query every source at once and handle responses as they arrive
+    async with _client_session(timeout=20) as session:
+        tasks = [asyncio.create_task(fetch(session, source)) for source in news_sources]
         try:
-            print(f"NEWS SEARCH: Trying {source['name']}...")
-            
-            headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
-            response = requests.get(source['url'], headers=headers, timeout=20)
-            print(f"NEWS SEARCH: {source['name']} status: {response.status_code}")
-            
-            if response.status_code == 200:
-                from bs4 import BeautifulSoup
-                soup = BeautifulSoup(response.text, 'html.parser')
-                
-                # Look for news content
-                for element in soup.find_all(["p", "h3", "div"]):
-                    text = element.get_text(strip=True)
-                    if text and len(text) > 30 and len(text) < 200:
-                        if any(word in text.lower() for word in ['rbi', 'bank', 'loan', 'rate', 'announces', 'new']):
-                            clean_text = text_processor.clean_text(text)
-                            news_item = f"{source['name']}: {clean_text}"
-                            if news_item not in found_news:
-                                found_news.append(news_item)
-                                print(f"NEWS SEARCH: Found news from {source['name']}: {clean_text[:60]}...")
-                                
-                                if len(found_news) >= 5:
-                                    break
-                                    
-        except Exception as e:
-            print(f"NEWS SEARCH: Error with {source['name']}: {e}")
-            continue
+            for next_done in asyncio.as_completed(tasks):
+                source, outcome = await next_done
+                try:
+                    if isinstance(outcome, Exception):
+                        raise outcome
+                    status_code, body = outcome
+                    logger.debug("NEWS SEARCH: %s status: %s", source['name'], status_code)
+                    
+                    if status_code == 200:
+                        soup = BeautifulSoup(body, 'lxml', parse_only=ARTICLE_TEXT_STRAINER)
+                        
+                        # Look for news content
+                        for element in soup.find_all(ARTICLE_TEXT_TAGS):
+                            text = element.get_text(strip=True)
+                            if text and len(text) > 30 and len(text) < 200:
+                                if _NEWS_RE.search(text):
+                                    clean_text = _intern(text_processor.clean_text(text))
+                                    news_item = f"{source['name']}: {clean_text}"
+                                    if news_item not in seen_news:
+                                        seen_news.add(news_item)
+                                        found_news.append(news_item)
+                                        logger.debug("NEWS SEARCH: Found news from %s: %s...", source['name'], clean_text[:60])
+                                        
+                                        if len(found_news) >= 5:
+                                            break
+                        
+                        if len(found_news) >= 5:
+                            break
+                                            
+                except Exception as e:
+                    logger.warning("NEWS SEARCH: Error with %s: %s", source['name'], e)
+                    continue
+        finally:
+            # Don't wait for slower sources once there are enough results
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
     
     if found_news:
-        return "\n\n".join(found_news)
+        result = "\n\n".join(found_news)
+        search_cache.set(cache_key, result)
+        return result
     else:
         return fallback_news
 
+def search_banking_news(query: str = "Indian banking news RBI") -> str:
+    # Synchronous wrapper for callers outside an event loop
+    return asyncio.run(search_banking_news_async(query))
+
 # Get current RBI repo rate
-def get_current_repo_rate() -> str:
+async def get_current_repo_rate_async() -> str:
     # Get current RBI repo rate
-    print(f"REPO RATE SEARCH: Looking for current repo rate...")
+    logger.debug("REPO RATE SEARCH: Looking for current repo rate...")
+    
+    cached = repo_rate_cache.get("repo_rate")
+    if cached is None:
+        cached = _load_repo_rate()
+        if cached is not None:
+            repo_rate_cache.set("repo_rate", cached)
+    if cached is not None:
+        return cached
     
     # Fallback info
     fallback_info = """
@@ -153,49 +307,73 @@ def get_current_repo_rate() -> str:
         {"name": "RBI Homepage", "url": "https://www.rbi.org.in/"}
     ]
     
-    for source in rbi_sources:
+    async def fetch(session, source):
+        logger.debug("REPO RATE SEARCH: Trying %s...", source['name'])
         try:
-            print(f"REPO RATE SEARCH: Trying {source['name']}...")
-            
-            headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
-            response = requests.get(source['url'], headers=headers, timeout=15)
-            print(f"REPO RATE SEARCH: {source['name']} status: {response.status_code}")
-            
-            if response.status_code == 200:
-                from bs4 import BeautifulSoup
-                soup = BeautifulSoup(response.text, 'html.parser')
-                
-                # Look for repo rate info
-                for element in soup.find_all(["p", "h3", "div"]):
-                    text = element.get_text(strip=True)
-                    if text and 'repo rate' in text.lower():
-                        if any(word in text.lower() for word in ['6.50', '6.5', '6.25', '6.75']):
-                            print(f"REPO RATE SEARCH: Found rate info: {text[:100]}...")
-                            return f"Current RBI Repo Rate: {text}"
-                            
+            return source, await _fetch(session, "GET", source['url'])
         except Exception as e:
-            print(f"REPO RATE SEARCH: Error with {source['name']}: {e}")
-            continue
+            return source, e
+    
+    # Start the web search backup right away so it does not wait for the RBI pages
+    logger.debug("REPO RATE SEARCH: Trying web search...")
+    web_search = asyncio.create_task(live_web_search_async("current RBI repo rate 2024", 3))
     
-    # Try web search as backup
     try:
-        print(f"REPO RATE SEARCH: Trying web search...")
-        web_results = live_web_search("current RBI repo rate 2024", 3)
-        if web_results and "error" not in web_results.lower():
-            return f"Current RBI Repo Rate (from web search):\n{web_results}"
-    except:
-        pass
+        async with _client_session(timeout=15) as session:
+            outcomes = await asyncio.gather(*(fetch(session, source) for source in rbi_sources))
+        
+        # Check the RBI pages in priority order
+        for source, outcome in outcomes:
+            try:
+                if isinstance(outcome, Exception):
+                    raise outcome
+                status_code, body = outcome
+                logger.debug("REPO RATE SEARCH: %s status: %s", source['name'], status_code)
+                
+                if status_code == 200:
+                    soup = BeautifulSoup(body, 'lxml', parse_only=ARTICLE_TEXT_STRAINER)
+                    
+                    # Look for repo rate info
+                    for element in soup.find_all(ARTICLE_TEXT_TAGS):
+                        text = element.get_text(strip=True)
+                        if text and 'repo rate' in text.lower():
+                            if any(word in text.lower() for word in ['6.50', '6.5', '6.25', '6.75']):
+                                logger.debug("REPO RATE SEARCH: Found rate info: %s...", text[:100])
+                                result = f"Current RBI Repo Rate: {text}"
+                                _save_repo_rate(result)
+                                return result
+                                
+            except Exception as e:
+                logger.warning("REPO RATE SEARCH: Error with %s: %s", source['name'], e)
+                continue
+        
+        # Use the web search as backup
+        try:
+            web_results = await web_search
+            if web_results and "error" not in web_results.lower():
+                result = f"Current RBI Repo Rate (from web search):\n{web_results}"
+                # Search snippets aren't necessarily a rate, so keep them out of the saved file
+                repo_rate_cache.set("repo_rate", result)
+                return result
+        except Exception:
+            pass
+    finally:
+        web_search.cancel()
     
     return fallback_info
 
+def get_current_repo_rate() -> str:
+    # Synchronous wrapper for callers outside an event loop
+    return asyncio.run(get_current_repo_rate_async())
+
 # Search for banking regulations
 def search_banking_regulations(query: str) -> str:
     # Search for banking rules and regulations
-    print(f"REGULATION SEARCH: Looking for banking regulations...")
+    logger.debug("REGULATION SEARCH: Looking for banking regulations...")
     
     # Try web search first
     try:
-        web_results = live_web_search(f"{query} banking regulations RBI rules", 3)
+        web_results = asyncio.run(live_web_search_async(f"{query} banking regulations RBI rules", 3))
         if web_results and "error" not in web_results.lower():
             return f"Banking Regulations (from web search):\n{web_results}"
     except: